@@ -1,17 +1,55 @@
+import io
 import os
+import sys
+import argparse
+import asyncio
+import time
 import logging
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import json
 
 from metadata import Metadata
 from pipeline_task_system import (
     Pipeline, PipelineBuilder, PipelineType, Task, TaskResult, TaskStatus,
-    ExportDataTask, UploadToADLSTask, DatabricksJobTask
+    ExportDataTask, UploadToADLSTask, DatabricksJobTask, task_end_time
 )
 
 logger = logging.getLogger(__name__)
 
+try:
+    import orjson
+
+    def _dumps(obj: Any) -> str:
+        """Serialize to indented JSON; datetimes and enums are handled natively"""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2, default=str).decode()
+except ImportError:
+    def _dumps(obj: Any) -> str:
+        """Serialize to indented JSON, stringifying unsupported values"""
+        return json.dumps(obj, indent=2, default=str)
+
+
+# Separator line framing multi-line log records
+_RULE = '=' * 60
+
+# Status markers used when printing results
+_STATUS_SYMBOL = {
+    TaskStatus.SUCCESS: "✓",
+    TaskStatus.FAILED: "✗",
+    TaskStatus.SKIPPED: "⚠"
+}
+
+_SHARED_METADATA: Optional[Metadata] = None
+
+
+def _meta() -> Metadata:
+    """Return the Metadata instance shared by all examples, creating it on first use"""
+    global _SHARED_METADATA
+    if _SHARED_METADATA is None:
+        _SHARED_METADATA = Metadata(environment_config_path="config/environments.json")
+    return _SHARED_METADATA
+
 
 # ============ Custom Task Examples ============
 
@@ -24,6 +62,7 @@ class DataQualityCheckTask(Task):
     
     def execute(self, context: Dict[str, Any]) -> TaskResult:
         """Execute data quality checks"""
+        t0 = time.perf_counter_ns()
         start_time = datetime.now()
         
         try:
@@ -53,7 +92,7 @@ class DataQualityCheckTask(Task):
             return TaskResult(
                 status=TaskStatus.SUCCESS,
                 start_time=start_time,
-                end_time=datetime.now(),
+                end_time=task_end_time(start_time, t0),
                 output={'quality_results': quality_results},
                 metadata={'rules_applied': len(quality_rules)}
             )
@@ -62,7 +101,7 @@ class DataQualityCheckTask(Task):
             return TaskResult(
                 status=TaskStatus.FAILED,
                 start_time=start_time,
-                end_time=datetime.now(),
+                end_time=task_end_time(start_time, t0),
                 error=str(e)
             )
 
@@ -76,6 +115,7 @@ class NotificationTask(Task):
     
     def execute(self, context: Dict[str, Any]) -> TaskResult:
         """Send notification"""
+        t0 = time.perf_counter_ns()
         start_time = datetime.now()
         
         try:
@@ -91,7 +131,7 @@ class NotificationTask(Task):
                 body = self._build_failure_report(context)
             else:
                 subject = "Pipeline notification"
-                body = json.dumps(context, indent=2)
+                body = _dumps(context)
             
             logger.info(f"Sending {notification_type} notification to {email}")
             logger.info(f"Subject: {subject}")
@@ -102,7 +142,7 @@ class NotificationTask(Task):
             return TaskResult(
                 status=TaskStatus.SUCCESS,
                 start_time=start_time,
-                end_time=datetime.now(),
+                end_time=task_end_time(start_time, t0),
                 output={'notification_sent': True, 'recipient': email},
                 metadata={'type': notification_type, 'subject': subject}
             )
@@ -111,25 +151,27 @@ class NotificationTask(Task):
             return TaskResult(
                 status=TaskStatus.FAILED,
                 start_time=start_time,
-                end_time=datetime.now(),
+                end_time=task_end_time(start_time, t0),
                 error=str(e)
             )
     
     def _build_completion_report(self, context: Dict[str, Any]) -> str:
         """Build completion report"""
-        report = ["Pipeline Execution Report", "=" * 50]
+        buf = io.StringIO()
+        buf.write("Pipeline Execution Report\n")
+        buf.write("=" * 50)
         
         if 'exported_files' in context:
-            report.append("\nExported Files:")
+            buf.write("\n\nExported Files:")
             for file_info in context['exported_files']:
-                report.append(f"  - {file_info['table']}: {file_info['rows']} rows")
+                buf.write(f"\n  - {file_info['table']}: {file_info['rows']} rows")
         
         if 'quality_results' in context:
-            report.append("\nData Quality Results:")
+            buf.write("\n\nData Quality Results:")
             for result in context['quality_results']:
-                report.append(f"  - {result['table']}: {result['overall_status']}")
+                buf.write(f"\n  - {result['table']}: {result['overall_status']}")
         
-        return "\n".join(report)
+        return buf.getvalue()
     
     def _build_failure_report(self, context: Dict[str, Any]) -> str:
         """Build failure report"""
@@ -139,14 +181,14 @@ class NotificationTask(Task):
 
 # ============ Usage Examples ============
 
-def example_1_data_offloading_with_quality_checks():
+async def example_1_data_offloading_with_quality_checks():
     """Example: Data offloading pipeline with quality checks and notifications"""
     print("\n" + "="*60)
     print("Example 1: Data Offloading with Quality Checks")
     print("="*60)
     
     # Initialize metadata
-    metadata = Metadata(environment_config_path="config/environments.json")
+    metadata = _meta()
     
     # Create builder
     builder = PipelineBuilder(metadata)
@@ -170,44 +212,46 @@ def example_1_data_offloading_with_quality_checks():
     
     # Execute
     if pipeline.validate():
-        results = pipeline.execute()
+        results = await pipeline.execute_async()
         print_results(results)
 
 
-def example_2_transformation_pipeline():
+async def example_2_transformation_pipeline():
     """Example: Transformation pipeline with multiple Databricks jobs"""
     print("\n" + "="*60)
     print("Example 2: Data Transformation Pipeline")
     print("="*60)
     
-    metadata = Metadata(environment_config_path="config/environments.json")
+    metadata = _meta()
     builder = PipelineBuilder(metadata)
     
     # Custom transformation task
     class TransformationTask(DatabricksJobTask):
-        def execute(self, context: Dict[str, Any]) -> TaskResult:
+        async def execute_async(self, context: Dict[str, Any]) -> TaskResult:
             # Custom logic for transformation
             self.config['transformation_type'] = context.get('transformation_type', 'default')
-            return super().execute(context)
+            return await super().execute_async(context)
     
     # Build transformation pipeline
     pipeline = (builder
         .create_pipeline("customer_360_transform", PipelineType.TRANSFORMATION)
-        .add_custom_task(TransformationTask(
-            "aggregate_customer_data", 
-            metadata, 
-            {'job_type': 'customer_aggregation'}
-        ))
-        .add_custom_task(TransformationTask(
-            "join_transaction_data", 
-            metadata,
-            {'job_type': 'transaction_join'}
-        ))
-        .add_custom_task(TransformationTask(
-            "calculate_metrics",
-            metadata,
-            {'job_type': 'metric_calculation'}
-        ))
+        .add_parallel_group([
+            TransformationTask(
+                "aggregate_customer_data", 
+                metadata, 
+                {'job_type': 'customer_aggregation'}
+            ),
+            TransformationTask(
+                "join_transaction_data", 
+                metadata,
+                {'job_type': 'transaction_join'}
+            ),
+            TransformationTask(
+                "calculate_metrics",
+                metadata,
+                {'job_type': 'metric_calculation'}
+            ),
+        ])
         .add_custom_task(NotificationTask("notify_completion", metadata))
         .with_hook('after_task', track_transformation_metrics)
         .build()
@@ -218,17 +262,17 @@ def example_2_transformation_pipeline():
     pipeline.context['target_tables'] = ['dim_customer', 'fact_transactions']
     
     if pipeline.validate():
-        results = pipeline.execute()
+        results = await pipeline.execute_async()
         print_results(results)
 
 
-def example_3_conditional_pipeline():
+async def example_3_conditional_pipeline():
     """Example: Pipeline with conditional task execution"""
     print("\n" + "="*60)
     print("Example 3: Conditional Pipeline Execution")
     print("="*60)
     
-    metadata = Metadata(environment_config_path="config/environments.json")
+    metadata = _meta()
     
     # Custom conditional task
     class ConditionalTask(Task):
@@ -236,6 +280,7 @@ def example_3_conditional_pipeline():
             return True
         
         def execute(self, context: Dict[str, Any]) -> TaskResult:
+            t0 = time.perf_counter_ns()
             start_time = datetime.now()
             
             # Check condition from context
@@ -245,7 +290,7 @@ def example_3_conditional_pipeline():
                 return TaskResult(
                     status=TaskStatus.SKIPPED,
                     start_time=start_time,
-                    end_time=datetime.now(),
+                    end_time=task_end_time(start_time, t0),
                     metadata={'reason': 'Condition not met'}
                 )
             
@@ -255,7 +300,7 @@ def example_3_conditional_pipeline():
             return TaskResult(
                 status=TaskStatus.SUCCESS,
                 start_time=start_time,
-                end_time=datetime.now(),
+                end_time=task_end_time(start_time, t0),
                 output={'conditional_result': 'processed'}
             )
     
@@ -278,27 +323,34 @@ def example_3_conditional_pipeline():
     pipeline.context['is_weekend'] = datetime.now().weekday() >= 5
     
     if pipeline.validate():
-        results = pipeline.execute()
+        results = await pipeline.execute_async()
         print_results(results)
 
 
-def example_4_error_handling_pipeline():
+async def example_4_error_handling_pipeline():
     """Example: Pipeline with error handling and retry logic"""
     print("\n" + "="*60)
     print("Example 4: Pipeline with Error Handling")
     print("="*60)
     
-    metadata = Metadata(environment_config_path="config/environments.json")
+    metadata = _meta()
     
     # Task with retry logic
     class RetryableTask(Task):
+        def __init__(self, name: str, metadata: Metadata, config: Optional[Dict[str, Any]] = None):
+            super().__init__(name, metadata, config)
+            # Context keys used to track retries of this task
+            self.retry_count_key = f'{self.name}_retry_count'
+            self.retry_flag_key = f'{self.name}_should_retry'
+        
         def validate(self) -> bool:
             return True
         
         def execute(self, context: Dict[str, Any]) -> TaskResult:
+            t0 = time.perf_counter_ns()
             start_time = datetime.now()
             max_retries = self.config.get('max_retries', 3)
-            retry_count = context.get(f'{self.name}_retry_count', 0)
+            retry_count = context.get(self.retry_count_key, 0)
             
             try:
                 # Simulate occasional failure
@@ -308,27 +360,27 @@ def example_4_error_handling_pipeline():
                 return TaskResult(
                     status=TaskStatus.SUCCESS,
                     start_time=start_time,
-                    end_time=datetime.now(),
+                    end_time=task_end_time(start_time, t0),
                     output={'retry_count': retry_count}
                 )
                 
             except Exception as e:
                 if retry_count < max_retries:
                     # Set retry flag in context
-                    context[f'{self.name}_retry_count'] = retry_count + 1
-                    context[f'{self.name}_should_retry'] = True
+                    context[self.retry_count_key] = retry_count + 1
+                    context[self.retry_flag_key] = True
                     
                     return TaskResult(
                         status=TaskStatus.FAILED,
                         start_time=start_time,
-                        end_time=datetime.now(),
+                        end_time=task_end_time(start_time, t0),
                         error=f"{str(e)} (Retry {retry_count + 1}/{max_retries})"
                     )
                 else:
                     return TaskResult(
                         status=TaskStatus.FAILED,
                         start_time=start_time,
-                        end_time=datetime.now(),
+                        end_time=task_end_time(start_time, t0),
                         error=f"{str(e)} (Max retries exceeded)"
                     )
     
@@ -345,20 +397,39 @@ def example_4_error_handling_pipeline():
     )
     
     if pipeline.validate():
-        results = pipeline.execute()
+        results = await pipeline.execute_async()
         print_results(results)
 
 
+async def run_examples(serial: bool = False):
+    """Run the example pipelines, concurrently unless serial is requested"""
+    examples = (
+        example_1_data_offloading_with_quality_checks,
+        example_2_transformation_pipeline,
+        example_3_conditional_pipeline,
+        example_4_error_handling_pipeline,
+    )
+    
+    if serial:
+        for example in examples:
+            await example()
+    else:
+        await asyncio.gather(*(example() for example in examples))
+
+
 # ============ Hook Functions ============
 
 def log_pipeline_start(context: Dict[str, Any]):
     """Hook: Log pipeline start"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     pipeline = context['pipeline']
-    logger.info(f"{'='*60}")
-    logger.info(f"Starting pipeline: {pipeline.name}")
-    logger.info(f"Type: {pipeline.pipeline_type.value}")
-    logger.info(f"Environment: {pipeline.metadata.current_environment}")
-    logger.info(f"{'='*60}")
+    logger.info(
+        "%s\nStarting pipeline: %s\nType: %s\nEnvironment: %s\n%s",
+        _RULE, pipeline.name, pipeline.pipeline_type.value,
+        pipeline.environment, _RULE
+    )
 
 
 def log_task_completion(context: Dict[str, Any]):
@@ -376,19 +447,21 @@ def log_task_completion(context: Dict[str, Any]):
 
 def log_pipeline_summary(context: Dict[str, Any]):
     """Hook: Log pipeline summary"""
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    
     pipeline = context['pipeline']
     results = context['results']
     
-    success_count = sum(1 for r in results.values() if r.status == TaskStatus.SUCCESS)
-    failed_count = sum(1 for r in results.values() if r.status == TaskStatus.FAILED)
-    skipped_count = sum(1 for r in results.values() if r.status == TaskStatus.SKIPPED)
+    counts = Counter(r.status for r in results.values())
+    success_count = counts[TaskStatus.SUCCESS]
+    failed_count = counts[TaskStatus.FAILED]
+    skipped_count = counts[TaskStatus.SKIPPED]
     
-    logger.info(f"{'='*60}")
-    logger.info(f"Pipeline Summary: {pipeline.name}")
-    logger.info(f"  Successful: {success_count}")
-    logger.info(f"  Failed: {failed_count}")
-    logger.info(f"  Skipped: {skipped_count}")
-    logger.info(f"{'='*60}")
+    logger.info(
+        "%s\nPipeline Summary: %s\n  Successful: %d\n  Failed: %d\n  Skipped: %d\n%s",
+        _RULE, pipeline.name, success_count, failed_count, skipped_count, _RULE
+    )
 
 
 def track_transformation_metrics(context: Dict[str, Any]):
@@ -398,9 +471,11 @@ def track_transformation_metrics(context: Dict[str, Any]):
     
     if result.status == TaskStatus.SUCCESS and 'run_id' in result.output:
         # Here you would send metrics to monitoring system
-        logger.info(f"Tracking metrics for transformation: {task.name}")
-        logger.info(f"  Run ID: {result.output['run_id']}")
-        logger.info(f"  Duration: {(result.end_time - result.start_time).total_seconds()}s")
+        logger.info(
+            "Tracking metrics for transformation: %s\n  Run ID: %s\n  Duration: %ss",
+            task.name, result.output['run_id'],
+            (result.end_time - result.start_time).total_seconds()
+        )
 
 
 def set_execution_context(context: Dict[str, Any]):
@@ -409,7 +484,7 @@ def set_execution_context(context: Dict[str, Any]):
     
     # Add execution metadata
     pipeline.context['execution_time'] = datetime.now()
-    pipeline.context['environment'] = pipeline.metadata.current_environment
+    pipeline.context['environment'] = pipeline.environment
     pipeline.context['triggered_by'] = 'scheduler'  # or could read from metadata
 
 
@@ -419,7 +494,7 @@ def handle_task_failure(context: Dict[str, Any]):
     result = context['result']
     
     if result.status == TaskStatus.FAILED:
-        retry_flag = f'{task.name}_should_retry'
+        retry_flag = getattr(task, 'retry_flag_key', None) or f'{task.name}_should_retry'
         if context.get('context', {}).get(retry_flag):
             logger.warning(f"Task '{task.name}' failed but will be retried")
             # Here you could implement actual retry logic
@@ -444,20 +519,18 @@ def send_failure_notification(context: Dict[str, Any]):
 
 def print_results(results: Dict[str, TaskResult]):
     """Pretty print pipeline results"""
-    print("\nPipeline Execution Results:")
-    print("-" * 40)
+    lines = ["\nPipeline Execution Results:", "-" * 40]
     for task_name, result in results.items():
-        status_symbol = {
-            TaskStatus.SUCCESS: "✓",
-            TaskStatus.FAILED: "✗",
-            TaskStatus.SKIPPED: "⚠"
-        }.get(result.status, "?")
+        status_symbol = _STATUS_SYMBOL.get(result.status, "?")
         
-        print(f"{status_symbol} {task_name}: {result.status.value}")
+        lines.append(f"{status_symbol} {task_name}: {result.status.value}")
         if result.error:
-            print(f"  Error: {result.error}")
+            lines.append(f"  Error: {result.error}")
         if result.metadata:
-            print(f"  Metadata: {result.metadata}")
+            lines.append(f"  Metadata: {result.metadata}")
+    
+    # Emit the whole report with a single write
+    sys.stdout.write("\n".join(lines) + "\n")
 
 
 # ============ Builder Pattern Explanation ============
@@ -522,6 +595,13 @@ def explain_builder_pattern():
 # ============ Main Execution ============
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the pipeline examples")
+    parser.add_argument('--serial', action='store_true',
+                        help="run the examples one after another for reproducible output")
+    parser.add_argument('--live', action='store_true',
+                        help="trigger real Databricks runs; needs a reachable workspace and token")
+    args = parser.parse_args()
+    
     # Set up logging
     logging.basicConfig(
         level=logging.INFO,
@@ -536,12 +616,11 @@ if __name__ == "__main__":
     os.environ['ADLS_ACCOUNT_NAME'] = 'storage'
     os.environ['ADLS_ACCOUNT_KEY'] = 'key'
     os.environ['DATABRICKS_TOKEN'] = 'token'
+    if not args.live:
+        os.environ['DATABRICKS_DRY_RUN'] = '1'
     
     # Run examples
-    example_1_data_offloading_with_quality_checks()
-    example_2_transformation_pipeline()
-    example_3_conditional_pipeline()
-    example_4_error_handling_pipeline()
+    asyncio.run(run_examples(serial=args.serial))
     
     # Explain builder pattern
     explain_builder_pattern()
\ No newline at end of file
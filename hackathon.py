@@ -7,7 +7,7 @@
 # - frontend.html (Simple UI)
 
 # === models.py ===
-from pydantic import BaseModel
+import msgspec
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from enum import Enum
@@ -18,7 +18,7 @@ class QueryType(str, Enum):
     REPORT = "report"
     COMPARE = "compare"
 
-class Fund(BaseModel):
+class Fund(msgspec.Struct, frozen=True):
     id: str
     name: str
     country: str
@@ -29,80 +29,257 @@ class Fund(BaseModel):
     inception_date: datetime
     expense_ratio: float
     
-class AgentRequest(BaseModel):
+# Messages never form reference cycles, so they opt out of GC tracking (gc=False);
+# those not mutated after construction are also frozen.
+class AgentRequest(msgspec.Struct, gc=False):
     query: str
     context: Optional[Dict[str, Any]] = None
     query_type: Optional[QueryType] = None
 
-class AgentResponse(BaseModel):
+class AgentResponse(msgspec.Struct, kw_only=True, frozen=True, gc=False):
     success: bool
     data: Any
     message: str
     visualization: Optional[Dict[str, Any]] = None
     agent_name: str
 
-class ChatMessage(BaseModel):
+class ChatMessage(msgspec.Struct, kw_only=True, frozen=True, gc=False):
     role: str  # "user" or "assistant"
     content: str
-    timestamp: datetime
+    timestamp: float  # Unix time; convert with datetime.fromtimestamp when displaying
     data: Optional[Any] = None
     visualization: Optional[Dict[str, Any]] = None
 
+class WSOut(msgspec.Struct, kw_only=True, frozen=True, gc=False):
+    """Outbound websocket frame for an agent response; every key is always sent"""
+    role: str
+    content: str
+    data: Any = None
+    visualization: Optional[Dict[str, Any]] = None
+    agent: Optional[str] = None
+
+class WSError(msgspec.Struct, kw_only=True, frozen=True, gc=False):
+    """Outbound websocket frame for a rejected query"""
+    role: str
+    content: str
+    error: bool = True
+
+class WSStart(msgspec.Struct, kw_only=True, frozen=True, gc=False):
+    """Header of a streamed response; the total rows follow in WSChunk frames"""
+    role: str
+    content: str
+    visualization: Optional[Dict[str, Any]] = None
+    agent: Optional[str] = None
+    kind: str = "start"
+    total: int = 0
+
+class WSChunk(msgspec.Struct, kw_only=True, omit_defaults=True, frozen=True, gc=False):
+    """A batch of rows ("chunk") or the terminator ("end") of a streamed response"""
+    kind: str
+    rows: Optional[List[Any]] = None
+
 # === database.py ===
+from collections import defaultdict
 from datetime import datetime
-import random
+from functools import lru_cache
+import numpy as np
+
+@lru_cache(maxsize=1)
+def _generate_funds() -> tuple:
+    """Generate the sample fund corpus once; seeded so every run sees the same data"""
+    rng = np.random.default_rng(42)
+    n = 100
+    countries = ["China", "USA", "Japan", "Germany", "UK", "India", "Brazil", "Canada"]
+    categories = ["Equity", "Fixed Income", "Mixed Assets", "Money Market", "Real Estate"]
+    
+    # Draw every random column in one vectorised call each
+    columns = zip(
+        rng.choice(countries, size=n).tolist(),
+        rng.uniform(100, 5000, n).round(2).tolist(),
+        rng.uniform(-10, 30, n).round(2).tolist(),
+        rng.uniform(-5, 25, n).round(2).tolist(),
+        rng.choice(categories, size=n).tolist(),
+        rng.uniform(0.5, 2.5, n).round(2).tolist(),
+    )
+    
+    return tuple(
+        Fund(
+            id=f"FUND{i:03d}",
+            name=f"{country} {'Growth' if i % 2 == 0 else 'Value'} Fund {i}",
+            country=country,
+            aum=aum,
+            performance_1y=performance_1y,
+            performance_3y=performance_3y,
+            category=category,
+            inception_date=datetime(2010 + i % 10, 1, 1),
+            expense_ratio=expense_ratio
+        )
+        for i, (country, aum, performance_1y, performance_3y, category, expense_ratio)
+        in enumerate(columns)
+    )
+
+@lru_cache(maxsize=1)
+def _fund_columns() -> Dict[str, np.ndarray]:
+    """Column arrays over the fund corpus, used for vectorised filtering"""
+    funds = _generate_funds()
+    return {
+        "aum": np.array([f.aum for f in funds], dtype=np.float64),
+    }
+
+@lru_cache(maxsize=1)
+def _fund_indexes() -> Dict[str, Dict[str, np.ndarray]]:
+    """Inverted indexes from lower-cased country/category to fund positions"""
+    by_country = defaultdict(list)
+    by_category = defaultdict(list)
+    for i, f in enumerate(_generate_funds()):
+        by_country[f.country.lower()].append(i)
+        by_category[f.category.lower()].append(i)
+    return {
+        "country": {k: np.array(v) for k, v in by_country.items()},
+        "category": {k: np.array(v) for k, v in by_category.items()},
+    }
+
+@lru_cache(maxsize=1)
+def _fund_records() -> tuple:
+    """JSON-ready dicts for each fund, built once; shared, so treat as read-only"""
+    return tuple(msgspec.to_builtins(f) for f in _generate_funds())
 
 class MockDatabase:
     """Mock database with sample fund data"""
     
     @staticmethod
     def get_funds():
-        countries = ["China", "USA", "Japan", "Germany", "UK", "India", "Brazil", "Canada"]
-        categories = ["Equity", "Fixed Income", "Mixed Assets", "Money Market", "Real Estate"]
-        
-        funds = []
-        for i in range(100):
-            country = random.choice(countries)
-            funds.append(Fund(
-                id=f"FUND{i:03d}",
-                name=f"{country} {'Growth' if i % 2 == 0 else 'Value'} Fund {i}",
-                country=country,
-                aum=round(random.uniform(100, 5000), 2),
-                performance_1y=round(random.uniform(-10, 30), 2),
-                performance_3y=round(random.uniform(-5, 25), 2),
-                category=random.choice(categories),
-                inception_date=datetime(2010 + i % 10, 1, 1),
-                expense_ratio=round(random.uniform(0.5, 2.5), 2)
-            ))
-        return funds
+        return _generate_funds()
     
     @staticmethod
     def query_funds(filters: Dict[str, Any]) -> List[Fund]:
         funds = MockDatabase.get_funds()
+        return [funds[i] for i in MockDatabase._match(filters)]
+    
+    @staticmethod
+    def query_fund_records(filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Like query_funds, but returns the cached dict form of each fund"""
+        records = _fund_records()
+        return [records[i] for i in MockDatabase._match(filters)]
+    
+    @staticmethod
+    def _match(filters: Dict[str, Any]) -> np.ndarray:
+        """Positions of the funds matching all filters"""
+        indexes = _fund_indexes()
+        candidates = np.arange(len(_generate_funds()))
         
-        if "country" in filters:
-            funds = [f for f in funds if f.country.lower() == filters["country"].lower()]
+        # Narrow down with the equality indexes before scanning numeric columns
+        for field in ("country", "category"):
+            if field in filters:
+                positions = indexes[field].get(filters[field].lower(), candidates[:0])
+                candidates = np.intersect1d(candidates, positions, assume_unique=True)
         
         if "min_aum" in filters:
-            funds = [f for f in funds if f.aum >= filters["min_aum"]]
-        
-        if "category" in filters:
-            funds = [f for f in funds if f.category.lower() == filters["category"].lower()]
+            candidates = candidates[_fund_columns()["aum"][candidates] >= filters["min_aum"]]
         
-        return funds
+        return candidates
 
 # === agents.py ===
-import json
-from typing import List, Dict, Any, Optional
+import asyncio
+import heapq
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
 import re
 
+# Countries recognised in search queries, keyed by lower-case spelling
+_COUNTRIES = {c.lower(): c for c in ["China", "USA", "Japan", "Germany", "UK", "India", "Brazil", "Canada"]}
+
+# Every pattern the agents use, compiled once at import
+_REGEX = SimpleNamespace(
+    # Routing keywords per query type, checked in order; anything else is a search.
+    # Keywords must start at a word boundary so e.g. "canvas" doesn't route as "vs".
+    route={
+        QueryType.VISUALIZE: re.compile(r"\b(?:visualize|plot|chart|graph|show me)"),
+        QueryType.REPORT: re.compile(r"\b(?:report|summary|analyze)"),
+        QueryType.COMPARE: re.compile(r"\b(?:compare|versus|vs)"),
+    },
+    country=re.compile(r"\b(" + "|".join(_COUNTRIES) + r")\b", re.IGNORECASE),
+    aum=re.compile(r"(?:aum|assets).*?(\d+)", re.IGNORECASE),
+    top_n=re.compile(r"top\s+(\d+)"),
+)
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; reports fall back to the NumPy reductions
+    njit = None
+
+def _reduce_columns(aum, performance_1y, performance_3y):
+    """Total AUM, mean 1y/3y performance and the index of the largest fund"""
+    return aum.sum(), performance_1y.mean(), performance_3y.mean(), aum.argmax()
+
+if njit is not None:
+    _reduce_columns_jit = njit(cache=True)(_reduce_columns)
+    # Compile (or load from numba's on-disk cache) at import so the first report doesn't pay for it
+    _reduce_columns_jit(np.zeros(1), np.zeros(1), np.zeros(1))
+else:
+    _reduce_columns_jit = None
+
+def _validation_error(query: str) -> Optional[str]:
+    """Reason the query is rejected, or None if it is acceptable"""
+    if not query or len(query.strip()) == 0:
+        return "Query cannot be empty"
+    if len(query) > 500:
+        return "Query too long (max 500 characters)"
+    return None
+
+@lru_cache(maxsize=1024)
+def _route(query: str) -> QueryType:
+    """Pick the query type from routing keywords; defaults to search.
+    Cached since sessions repeat the same short queries."""
+    query_lower = query.lower()
+    for query_type, pattern in _REGEX.route.items():
+        if pattern.search(query_lower):
+            return query_type
+    return QueryType.SEARCH
+
+def classify(query: str) -> Tuple[Optional[str], Optional[QueryType]]:
+    """Validate and route a query in one call, returning (error, query_type)"""
+    error = _validation_error(query)
+    if error:
+        return error, None
+    return None, _route(query)
+
+@lru_cache(maxsize=1024)
+def _extract_filters_impl(query: str) -> Tuple[Tuple[str, Any], ...]:
+    """Search filters in a query as (name, value) pairs; cached like _route"""
+    filters = []
+    
+    # Extract country
+    country_match = _REGEX.country.search(query)
+    if country_match:
+        filters.append(("country", _COUNTRIES[country_match.group(1).lower()]))
+    
+    # Extract AUM filter
+    aum_match = _REGEX.aum.search(query)
+    if aum_match:
+        filters.append(("min_aum", float(aum_match.group(1))))
+    
+    return tuple(filters)
+
 class BaseAgent(ABC):
     """Base class for all agents"""
     
+    # Result sets at least this large are processed in a worker thread, off the event loop
+    OFFLOAD_MIN_ROWS = 256
+    
     def __init__(self, name: str):
         self.name = name
     
+    async def _run_cpu(self, func, data, *args):
+        """Call func(*args, data); large inputs run in a thread so other sessions keep going"""
+        if len(data) < self.OFFLOAD_MIN_ROWS:
+            return func(*args, data)
+        return await asyncio.to_thread(func, *args, data)
+    
     @abstractmethod
     async def process(self, request: AgentRequest) -> AgentResponse:
         pass
@@ -119,17 +296,7 @@ class RouterAgent(BaseAgent):
         super().__init__("RouterAgent")
     
     async def process(self, request: AgentRequest) -> AgentResponse:
-        query_lower = request.query.lower()
-        
-        # Simple routing logic
-        if any(word in query_lower for word in ["visualize", "plot", "chart", "graph", "show me"]):
-            query_type = QueryType.VISUALIZE
-        elif any(word in query_lower for word in ["report", "summary", "analyze"]):
-            query_type = QueryType.REPORT
-        elif any(word in query_lower for word in ["compare", "versus", "vs"]):
-            query_type = QueryType.COMPARE
-        else:
-            query_type = QueryType.SEARCH
+        query_type = _route(request.query)
         
         return AgentResponse(
             success=True,
@@ -151,14 +318,14 @@ class SearchAgent(BaseAgent):
             filters = self._extract_filters(request.query)
             
             # Query database
-            funds = self.db.query_funds(filters)
+            funds = self.db.query_fund_records(filters)
             
             # Call LLM to format response
             llm_response = self._call_llm(request.query, funds)
             
             return AgentResponse(
                 success=True,
-                data=[f.dict() for f in funds],
+                data=funds,
                 message=f"Found {len(funds)} funds matching your criteria. " + llm_response,
                 agent_name=self.name
             )
@@ -171,27 +338,21 @@ class SearchAgent(BaseAgent):
             )
     
     def _extract_filters(self, query: str) -> Dict[str, Any]:
-        filters = {}
-        
-        # Extract country
-        countries = ["China", "USA", "Japan", "Germany", "UK", "India", "Brazil", "Canada"]
-        for country in countries:
-            if country.lower() in query.lower():
-                filters["country"] = country
-                break
-        
-        # Extract AUM filter
-        aum_match = re.search(r"(?:aum|assets).*?(\d+)", query.lower())
-        if aum_match:
-            filters["min_aum"] = float(aum_match.group(1))
-        
-        return filters
+        # The cached pairs are shared, so each caller gets its own dict
+        return dict(_extract_filters_impl(query))
 
 class VisualizationAgent(BaseAgent):
     """Creates visualization specifications for the frontend"""
     
+    # Number of recent top-N selections kept for reuse
+    TOP_N_CACHE_SIZE = 32
+    
     def __init__(self):
         super().__init__("VisualizationAgent")
+        # (id(data), top_n) -> (data, top funds); holding data keeps its id from being reused
+        self._top_n_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+        # Visualizations may run in worker threads, so cache updates are serialized
+        self._top_n_lock = threading.Lock()
     
     async def process(self, request: AgentRequest) -> AgentResponse:
         try:
@@ -205,7 +366,7 @@ class VisualizationAgent(BaseAgent):
                 )
             
             data = request.context["data"]
-            viz_spec = self._create_visualization(request.query, data)
+            viz_spec = await self._run_cpu(self._create_visualization, data, request.query)
             
             return AgentResponse(
                 success=True,
@@ -228,11 +389,11 @@ class VisualizationAgent(BaseAgent):
         # Determine visualization type
         if "top" in query_lower:
             # Extract number for top N
-            num_match = re.search(r"top\s+(\d+)", query_lower)
+            num_match = _REGEX.top_n.search(query_lower)
             top_n = int(num_match.group(1)) if num_match else 5
             
-            # Sort by AUM and get top N
-            sorted_data = sorted(data, key=lambda x: x["aum"], reverse=True)[:top_n]
+            # Get top N by AUM
+            sorted_data = self._top_by_aum(data, top_n)
             
             return {
                 "type": "bar",
@@ -272,10 +433,31 @@ class VisualizationAgent(BaseAgent):
                     "title": "Fund Overview"
                 }
             }
+    
+    def _top_by_aum(self, data: List[Dict], top_n: int) -> List[Dict]:
+        """Largest funds by AUM, memoized per result set since sessions re-plot the same data"""
+        key = (id(data), top_n)
+        with self._top_n_lock:
+            entry = self._top_n_cache.get(key)
+            if entry is not None and entry[0] is data:
+                self._top_n_cache.move_to_end(key)
+                return entry[1]
+        
+        top = heapq.nlargest(top_n, data, key=lambda x: x["aum"])
+        with self._top_n_lock:
+            self._top_n_cache[key] = (data, top)
+            if len(self._top_n_cache) > self.TOP_N_CACHE_SIZE:
+                self._top_n_cache.popitem(last=False)
+        return top
 
 class ReportAgent(BaseAgent):
     """Generates reports and summaries"""
     
+    # Below this many rows, building arrays costs more than it saves
+    VECTORIZE_MIN_ROWS = 32
+    # Above this many rows the numba-compiled reductions are used, when numba is installed
+    JIT_MIN_ROWS = 1000
+    
     def __init__(self):
         super().__init__("ReportAgent")
     
@@ -290,7 +472,7 @@ class ReportAgent(BaseAgent):
                 )
             
             data = request.context["data"]
-            report = self._generate_report(data)
+            report = await self._run_cpu(self._generate_report, data)
             
             return AgentResponse(
                 success=True,
@@ -310,17 +492,11 @@ class ReportAgent(BaseAgent):
         if not data:
             return {"summary": "No data available"}
         
-        total_aum = sum(f["aum"] for f in data)
-        avg_performance_1y = sum(f["performance_1y"] for f in data) / len(data)
-        avg_performance_3y = sum(f["performance_3y"] for f in data) / len(data)
-        
-        country_breakdown = {}
-        for f in data:
-            country = f["country"]
-            if country not in country_breakdown:
-                country_breakdown[country] = {"count": 0, "total_aum": 0}
-            country_breakdown[country]["count"] += 1
-            country_breakdown[country]["total_aum"] += f["aum"]
+        if len(data) < self.VECTORIZE_MIN_ROWS:
+            aggregates = self._aggregate(data)
+        else:
+            aggregates = self._aggregate_vectorized(data)
+        total_aum, avg_performance_1y, avg_performance_3y, country_breakdown, top_index = aggregates
         
         return {
             "summary": {
@@ -329,9 +505,49 @@ class ReportAgent(BaseAgent):
                 "avg_performance_1y": round(avg_performance_1y, 2),
                 "avg_performance_3y": round(avg_performance_3y, 2),
                 "country_breakdown": country_breakdown,
-                "top_fund": max(data, key=lambda x: x["aum"])["name"] if data else None
+                "top_fund": data[top_index]["name"]
             }
         }
+    
+    @staticmethod
+    def _aggregate(data: List[Dict]) -> tuple:
+        total_aum = sum(f["aum"] for f in data)
+        avg_performance_1y = sum(f["performance_1y"] for f in data) / len(data)
+        avg_performance_3y = sum(f["performance_3y"] for f in data) / len(data)
+        
+        # [count, total_aum] per country, shaped into dicts once at the end
+        acc = defaultdict(lambda: [0, 0.0])
+        for f in data:
+            entry = acc[f["country"]]
+            entry[0] += 1
+            entry[1] += f["aum"]
+        country_breakdown = {c: {"count": v[0], "total_aum": v[1]} for c, v in acc.items()}
+        
+        top_index = max(range(len(data)), key=lambda i: data[i]["aum"])
+        return total_aum, avg_performance_1y, avg_performance_3y, country_breakdown, top_index
+    
+    @classmethod
+    def _aggregate_vectorized(cls, data: List[Dict]) -> tuple:
+        n = len(data)
+        aum = np.fromiter((f["aum"] for f in data), dtype=np.float64, count=n)
+        performance_1y = np.fromiter((f["performance_1y"] for f in data), dtype=np.float64, count=n)
+        performance_3y = np.fromiter((f["performance_3y"] for f in data), dtype=np.float64, count=n)
+        
+        # Group by country; order groups by first appearance like the dict-based path
+        countries, first_seen, group = np.unique(
+            [f["country"] for f in data], return_index=True, return_inverse=True
+        )
+        counts = np.bincount(group)
+        totals = np.bincount(group, weights=aum)
+        country_breakdown = {
+            str(countries[g]): {"count": int(counts[g]), "total_aum": float(totals[g])}
+            for g in np.argsort(first_seen)
+        }
+        
+        reduce = _reduce_columns_jit if _reduce_columns_jit is not None and n > cls.JIT_MIN_ROWS else _reduce_columns
+        total_aum, avg_performance_1y, avg_performance_3y, top_index = reduce(aum, performance_1y, performance_3y)
+        return (float(total_aum), float(avg_performance_1y), float(avg_performance_3y),
+                country_breakdown, int(top_index))
 
 class ValidatorAgent(BaseAgent):
     """Validates inputs and outputs"""
@@ -341,19 +557,12 @@ class ValidatorAgent(BaseAgent):
     
     async def process(self, request: AgentRequest) -> AgentResponse:
         # Simple validation
-        if not request.query or len(request.query.strip()) == 0:
+        error = _validation_error(request.query)
+        if error:
             return AgentResponse(
                 success=False,
                 data=None,
-                message="Query cannot be empty",
-                agent_name=self.name
-            )
-        
-        if len(request.query) > 500:
-            return AgentResponse(
-                success=False,
-                data=None,
-                message="Query too long (max 500 characters)",
+                message=error,
                 agent_name=self.name
             )
         
@@ -368,11 +577,70 @@ class ValidatorAgent(BaseAgent):
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
 from fastapi.middleware.cors import CORSMiddleware
-import json
-from datetime import datetime
-from typing import Dict, List
+import msgspec
+import orjson
+import secrets
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Deque, Dict, List, Set
+
+# Per-session history cap and idle-session reaping
+MAX_MESSAGES_PER_SESSION = 200
+SESSION_IDLE_TTL = 30 * 60
+REAP_INTERVAL = 5 * 60
+
+async def _reap_idle_sessions():
+    """Drop sessions idle past SESSION_IDLE_TTL whose websocket is gone, in case a handler never cleaned up"""
+    while True:
+        await asyncio.sleep(REAP_INTERVAL)
+        cutoff = time.monotonic() - SESSION_IDLE_TTL
+        for session_id in [sid for sid, seen in last_seen.items()
+                           if seen < cutoff and sid not in connected]:
+            _drop_session(session_id)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    reaper = asyncio.create_task(_reap_idle_sessions())
+    try:
+        yield
+    finally:
+        reaper.cancel()
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
+
+# Outbound frames are encoded straight from the WS* structs, without an intermediate dict
+_ws_encoder = msgspec.json.Encoder()
+# Result lists longer than this are streamed in batches of this many rows, for clients
+# that connect with ?stream=1; everyone else gets the whole list in one frame
+STREAM_CHUNK_ROWS = 50
+
+async def _send_response(websocket: WebSocket, response: AgentResponse, stream: bool = False):
+    """Send a response in one frame, or as start/chunk.../end frames for long result lists when streaming"""
+    data = response.data
+    if not stream or not isinstance(data, list) or len(data) <= STREAM_CHUNK_ROWS:
+        await websocket.send_text(_ws_encoder.encode(WSOut(
+            role="assistant",
+            content=response.message,
+            data=data,
+            visualization=response.visualization,
+            agent=response.agent_name
+        )).decode())
+        return
+    
+    await websocket.send_text(_ws_encoder.encode(WSStart(
+        role="assistant",
+        content=response.message,
+        visualization=response.visualization,
+        agent=response.agent_name,
+        total=len(data)
+    )).decode())
+    for i in range(0, len(data), STREAM_CHUNK_ROWS):
+        await websocket.send_text(_ws_encoder.encode(
+            WSChunk(kind="chunk", rows=data[i:i + STREAM_CHUNK_ROWS])
+        ).decode())
+    await websocket.send_text(_ws_encoder.encode(WSChunk(kind="end")).decode())
 
 # Enable CORS
 app.add_middleware(
@@ -392,75 +660,96 @@ agents = {
     "validator": ValidatorAgent()
 }
 
-# Store conversation context
-conversations: Dict[str, List[ChatMessage]] = {}
+# Query types that operate on a session's previous results: agent key and reply when there are none
+_DATA_AGENTS = {
+    QueryType.VISUALIZE: ("visualize", "No data available for visualization"),
+    QueryType.REPORT: ("report", "No data available for report generation"),
+}
+
+# Store conversation context, keeping only the most recent messages per session
+conversations: Dict[str, Deque[ChatMessage]] = {}
+# Most recent non-empty response data per session, reused by follow-up queries
+last_data: Dict[str, Any] = {}
+# Monotonic time of each session's last activity, read by the reaper
+last_seen: Dict[str, float] = {}
+# Sessions with an open websocket; the reaper never drops these, however long they sit idle
+connected: Set[str] = set()
+
+def _history(session_id: str) -> Deque[ChatMessage]:
+    last_seen[session_id] = time.monotonic()
+    history = conversations.get(session_id)
+    if history is None:
+        history = conversations[session_id] = deque(maxlen=MAX_MESSAGES_PER_SESSION)
+    return history
+
+def _drop_session(session_id: str):
+    conversations.pop(session_id, None)
+    last_data.pop(session_id, None)
+    last_seen.pop(session_id, None)
+
+@lru_cache(maxsize=1)
+def _frontend_html() -> str:
+    """Read the UI page once; it doesn't change while the server runs"""
+    with open("frontend.html", encoding="utf-8") as fh:
+        return fh.read()
 
 @app.get("/")
 async def get():
-    return HTMLResponse(open("frontend.html").read())
+    return HTMLResponse(_frontend_html())
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
-    session_id = str(datetime.now().timestamp())
-    conversations[session_id] = []
+    session_id = secrets.token_hex(8)
+    connected.add(session_id)
+    # Chunked result frames are opt-in so existing clients keep the single-frame protocol
+    stream = websocket.query_params.get("stream") == "1"
+    _history(session_id)
     
     try:
         while True:
             # Receive message from client
             data = await websocket.receive_text()
-            message_data = json.loads(data)
+            message_data = orjson.loads(data)
             
             # Create user message
             user_message = ChatMessage(
                 role="user",
                 content=message_data["query"],
-                timestamp=datetime.now()
+                timestamp=time.time()
             )
-            conversations[session_id].append(user_message)
+            _history(session_id).append(user_message)
             
             # Process through agents
             request = AgentRequest(query=message_data["query"])
             
-            # 1. Validate input
-            validation_response = await agents["validator"].process(request)
-            if not validation_response.success:
-                await websocket.send_text(json.dumps({
-                    "role": "assistant",
-                    "content": validation_response.message,
-                    "error": True
-                }))
+            # 1. Validate input and 2. route query, inline on the hot path
+            error, query_type = classify(request.query)
+            if error:
+                await websocket.send_text(_ws_encoder.encode(WSError(
+                    role="assistant",
+                    content=error
+                )).decode())
                 continue
             
-            # 2. Route query
-            router_response = await agents["router"].process(request)
-            query_type = router_response.data["query_type"]
-            
             # 3. Process based on query type
             if query_type == QueryType.SEARCH:
                 response = await agents["search"].process(request)
             
-            elif query_type == QueryType.VISUALIZE:
-                # Get last search results from conversation
-                last_data = None
-                for msg in reversed(conversations[session_id]):
-                    if msg.data:
-                        last_data = msg.data
-                        break
-                
-                request.context = {"data": last_data} if last_data else None
-                response = await agents["visualize"].process(request)
-            
-            elif query_type == QueryType.REPORT:
-                # Get last search results from conversation
-                last_data = None
-                for msg in reversed(conversations[session_id]):
-                    if msg.data:
-                        last_data = msg.data
-                        break
-                
-                request.context = {"data": last_data} if last_data else None
-                response = await agents["report"].process(request)
+            elif query_type in _DATA_AGENTS:
+                # Follow-ups work on the last search results; answer directly when there are none
+                agent_key, no_data_message = _DATA_AGENTS[query_type]
+                session_data = last_data.get(session_id)
+                if session_data is None:
+                    response = AgentResponse(
+                        success=False,
+                        data=None,
+                        message=no_data_message,
+                        agent_name=agents[agent_key].name
+                    )
+                else:
+                    request.context = {"data": session_data}
+                    response = await agents[agent_key].process(request)
             
             else:
                 response = AgentResponse(
@@ -474,23 +763,22 @@ async def websocket_endpoint(websocket: WebSocket):
             assistant_message = ChatMessage(
                 role="assistant",
                 content=response.message,
-                timestamp=datetime.now(),
+                timestamp=time.time(),
                 data=response.data,
                 visualization=response.visualization
             )
-            conversations[session_id].append(assistant_message)
+            _history(session_id).append(assistant_message)
+            if response.data:
+                last_data[session_id] = response.data
             
             # Send response to client
-            await websocket.send_text(json.dumps({
-                "role": "assistant",
-                "content": response.message,
-                "data": response.data,
-                "visualization": response.visualization,
-                "agent": response.agent_name
-            }))
+            await _send_response(websocket, response, stream)
             
     except WebSocketDisconnect:
-        del conversations[session_id]
+        pass
+    finally:
+        connected.discard(session_id)
+        _drop_session(session_id)
 
 if __name__ == "__main__":
     import uvicorn
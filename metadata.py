@@ -1,16 +1,38 @@
 import os
+import re
+import time
+import hashlib
+import threading
 import yaml
+from types import MappingProxyType
 import json
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from collections import OrderedDict
+from typing import Dict, Any, Iterable, Mapping, Optional, List, Sequence, Tuple
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 import logging
 from enum import Enum
 
 logger = logging.getLogger(__name__)
 
+try:
+    # C JSON parser, several times faster than the stdlib on large API payloads
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    # libyaml-backed loader, much faster than the pure-Python SafeLoader
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
 
 class Environment(Enum):
     """Supported environments"""
@@ -19,7 +41,7 @@ class Environment(Enum):
     PROD = "prod"
 
 
-@dataclass
+@dataclass(slots=True)
 class MetadataConfig:
     """Environment-specific configuration loaded from JSON file"""
     name: str
@@ -27,6 +49,7 @@ class MetadataConfig:
     api_timeout: int = 30
     yaml_path: Optional[str] = None
     api_auth_token_env_key: str = "API_TOKEN"  # Environment variable key for API token
+    cache_ttl: int = 0  # Seconds to reuse the on-disk API response cache; 0 disables it
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'MetadataConfig':
@@ -36,10 +59,24 @@ class MetadataConfig:
             api_base_url=data.get('api_base_url', ''),
             api_timeout=data.get('api_timeout', 30),
             yaml_path=data.get('yaml_path'),
-            api_auth_token_env_key=data.get('api_auth_token_env_key', 'API_TOKEN')
+            api_auth_token_env_key=data.get('api_auth_token_env_key', 'API_TOKEN'),
+            cache_ttl=data.get('cache_ttl', 0)
         )
 
 
+@lru_cache(maxsize=8)
+def _load_env_configs(path: str, mtime: float) -> Dict[Environment, MetadataConfig]:
+    """Parse an environments JSON file once per (path, mtime), so edits still invalidate"""
+    with open(path, 'rb') as f:
+        data = _loads(f.read())
+    
+    return {
+        Environment(env_key): MetadataConfig.from_dict(env_data)
+        for env_key, env_data in data.items()
+        if env_key in ['dev', 'uat', 'prod']
+    }
+
+
 class EnvironmentResolver:
     """Resolves environment configuration based on DSF_DOMAIN"""
     
@@ -63,14 +100,9 @@ class EnvironmentResolver:
             return
         
         try:
-            with open(config_file, 'r') as f:
-                data = json.load(f)
-                
-            for env_key, env_data in data.items():
-                if env_key in ['dev', 'uat', 'prod']:
-                    env = Environment(env_key)
-                    self._configs[env] = MetadataConfig.from_dict(env_data)
-                    
+            self._configs.update(
+                _load_env_configs(str(config_file.resolve()), config_file.stat().st_mtime)
+            )
         except Exception as e:
             logger.error(f"Failed to load environment config: {e}")
     
@@ -96,17 +128,35 @@ class EnvironmentResolver:
         return self._configs[env]
 
 
+def _iter_flat(data: Dict[str, Any], prefix: str = ""):
+    """
+    Yield (dotted_path, value) for every node of nested dicts, subtrees included,
+    matching what dot-notation fetches return. None values are skipped, and so are
+    keys that dot-notation could never address (non-strings, or containing '.').
+    """
+    for key, value in data.items():
+        if not isinstance(key, str) or '.' in key or value is None:
+            continue
+        path = f"{prefix}{key}"
+        yield path, value
+        if isinstance(value, dict):
+            yield from _iter_flat(value, f"{path}.")
+
+
 class MetadataSource(ABC):
     """Abstract base class for metadata sources"""
     
+    # Empty so subclasses that declare __slots__ get no per-instance __dict__
+    __slots__ = ()
+    
     @abstractmethod
     def fetch(self, key: str) -> Optional[Any]:
         """Fetch metadata value by key"""
         pass
     
     @abstractmethod
-    def fetch_all(self) -> Dict[str, Any]:
-        """Fetch all metadata from this source"""
+    def fetch_all(self) -> Mapping[str, Any]:
+        """Read-only view of all metadata in this source"""
         pass
     
     @abstractmethod
@@ -118,118 +168,282 @@ class MetadataSource(ABC):
 class EnvironmentMetadataSource(MetadataSource):
     """Metadata source for environment variables"""
     
+    __slots__ = ('prefix', '_cache')
+    
     def __init__(self, prefix: str = ""):
         self.prefix = prefix
+        # Snapshot of matching variables with the prefix removed; rebuilt on refresh()
+        self._cache: Dict[str, str] = {}
+        self.refresh()
     
     def fetch(self, key: str) -> Optional[Any]:
-        """Fetch from environment with optional prefix"""
-        env_key = f"{self.prefix}{key}" if self.prefix else key
-        return os.environ.get(env_key)
+        """Fetch from the environment snapshot (key without prefix)"""
+        return self._cache.get(key)
     
-    def fetch_all(self) -> Dict[str, Any]:
+    def fetch_all(self) -> Mapping[str, Any]:
         """Return all environment variables with the prefix"""
-        result = {}
-        for key, value in os.environ.items():
-            if self.prefix and key.startswith(self.prefix):
-                # Remove prefix for cleaner access
-                clean_key = key[len(self.prefix):]
-                result[clean_key] = value
-            elif not self.prefix:
-                result[key] = value
-        return result
+        return MappingProxyType(self._cache)
     
     def refresh(self) -> None:
-        """No-op for environment variables"""
-        pass
+        """Re-read environment variables into the snapshot"""
+        prefix = self.prefix
+        if not prefix:
+            self._cache = dict(os.environ)
+            return
+        
+        # Slice comparison against a pre-computed length; prefix removed for cleaner access
+        plen = len(prefix)
+        self._cache = {key[plen:]: value for key, value in os.environ.items() if key[:plen] == prefix}
+
+
+@lru_cache(maxsize=32)
+def _parse_yaml(path: str, mtime: float) -> Dict[str, Any]:
+    """Parse a YAML file once per (path, mtime); the result is shared, so treat it as read-only"""
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=_YamlLoader) or {}
 
 
 class YamlMetadataSource(MetadataSource):
     """Metadata source for YAML configuration files"""
     
+    __slots__ = ('yaml_path', '_data', '_flat')
+    
     def __init__(self, yaml_path: str):
         self.yaml_path = Path(yaml_path)
         self._data: Dict[str, Any] = {}
+        # Every dot-notation path (subtrees included) -> value, built once per load
+        self._flat: Dict[str, Any] = {}
         if self.yaml_path.exists():
             self.refresh()
     
     def fetch(self, key: str) -> Optional[Any]:
         """Fetch value using dot notation (e.g., 'pipeline.name')"""
-        keys = key.split('.')
-        value = self._data
-        
-        for k in keys:
-            if isinstance(value, dict) and k in value:
-                value = value[k]
-            else:
-                return None
-        
-        return value
+        return self._flat.get(key)
     
-    def fetch_all(self) -> Dict[str, Any]:
+    def fetch_all(self) -> Mapping[str, Any]:
         """Return all YAML data"""
-        return self._data.copy()
+        return MappingProxyType(self._data)
     
     def refresh(self) -> None:
         """Reload YAML file"""
         try:
-            with open(self.yaml_path, 'r') as f:
-                self._data = yaml.safe_load(f) or {}
+            self._data = _parse_yaml(str(self.yaml_path.resolve()), self.yaml_path.stat().st_mtime)
         except Exception as e:
             logger.error(f"Failed to load YAML from {self.yaml_path}: {e}")
             self._data = {}
+        self._flat = dict(_iter_flat(self._data)) if isinstance(self._data, dict) else {}
+
+
+# Query syntax: 'path[field=value,...].target.field'
+_QUERY_RE = re.compile(r'([^[]+)\[([^]]+)\](?:\.(.+))?')
+
+
+@lru_cache(maxsize=256)
+def _parse_query(query: str) -> Optional[Tuple[str, Tuple[Tuple[str, str], ...], Optional[Tuple[str, ...]]]]:
+    """
+    Parse a query into (list_path, conditions, target_path), or None if it doesn't match.
+    Conditions are sorted (field, value) pairs; target_path is None when no field is selected.
+    """
+    match = _QUERY_RE.match(query)
+    if not match:
+        return None
+    
+    list_path, conditions_str, target_field = match.groups()
+    
+    conditions = {}
+    for condition in conditions_str.split(','):
+        if '=' in condition:
+            field, value = condition.strip().split('=', 1)
+            conditions[field.strip()] = value.strip()
+    
+    target_path = tuple(target_field.split('.')) if target_field else None
+    return list_path, tuple(sorted(conditions.items())), target_path
 
 
 class ApiMetadataSource(MetadataSource):
     """Metadata source for API endpoints with support for nested JSON queries"""
     
+    __slots__ = ('base_url', 'auth_token', 'timeout', 'cache_ttl', '_headers',
+                 '_api_data', '_flat', '_indexes', '_indexable', '_batch_supported', '_session',
+                 '_loaded')
+    
+    # Directory holding API responses reused across processes when cache_ttl is set
+    CACHE_DIR = Path.home() / '.cache' / 'metadata'
+    
     def __init__(self, base_url: str, auth_token: Optional[str] = None, 
-                 timeout: int = 30):
+                 timeout: int = 30, cache_ttl: int = 0):
         self.base_url = base_url.rstrip('/')
         self.auth_token = auth_token
         self.timeout = timeout
+        self.cache_ttl = cache_ttl
         self._headers = {}
         self._api_data: Dict[str, Any] = {}
+        # Every dot-notation path (subtrees included) -> value, rebuilt per load
+        self._flat: Dict[str, Any] = {}
+        # (list_path, condition fields) -> {condition values: matching items}; rebuilt per load
+        self._indexes: Dict[Tuple[str, Tuple[str, ...]], Dict[Tuple, List[Dict[str, Any]]]] = {}
+        # list_path -> whether every item is a dict and so can be indexed; rebuilt per load
+        self._indexable: Dict[str, bool] = {}
+        # Cleared once the batch endpoint is missing or fails, so we stop trying it
+        self._batch_supported = True
         
         if self.auth_token:
             self._headers['Authorization'] = f"Bearer {self.auth_token}"
         
-        # Fetch all metadata on initialization
-        self._load_api_data()
+        # Pooled session so refreshes reuse the connection instead of a new TCP+TLS handshake
+        self._session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504])
+        )
+        self._session.mount('http://', adapter)
+        self._session.mount('https://', adapter)
+        self._session.headers.update(self._headers)
+        
+        # Metadata is fetched on first use, so callers that never touch the API don't wait on it
+        self._loaded = False
+    
+    def _ensure_loaded(self) -> None:
+        """Load API metadata if it hasn't been loaded since construction or the last refresh"""
+        if not self._loaded:
+            self._load_api_data()
+            data = self._api_data
+            self._flat = dict(_iter_flat(data)) if isinstance(data, dict) else {}
+            self._loaded = True
     
     def _load_api_data(self) -> None:
-        """Load all metadata from API endpoint"""
+        """
+        Load all metadata from API endpoint, or from the disk cache while it
+        is fresh. An expired cache entry is still used if the API fails.
+        """
+        self._indexes = {}
+        self._indexable = {}
+        cache_path = self._cache_path()
+        cached, age = self._read_disk_cache(cache_path) if self.cache_ttl > 0 else (None, None)
+        if cached is not None and age < self.cache_ttl:
+            self._api_data = cached['data']
+            logger.info(f"Loaded API metadata from cache {cache_path}")
+            return
+        
         try:
             endpoint = f"{self.base_url}/metadata"
-            response = requests.get(
-                endpoint,
-                headers=self._headers,
-                timeout=self.timeout
-            )
-            response.raise_for_status()
-            self._api_data = response.json()
-            logger.info(f"Successfully loaded API metadata from {endpoint}")
+            headers = {}
+            if cached is not None and cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+            response = self._session.get(endpoint, headers=headers, timeout=self.timeout)
+            not_modified = response.status_code == 304 and cached is not None
+            if not not_modified:
+                response.raise_for_status()
+                data = _loads(response.content)
         except Exception as e:
-            logger.error(f"Failed to load API metadata: {e}")
-            self._api_data = {}
+            if cached is not None:
+                logger.warning(f"Failed to load API metadata, using stale cache {cache_path}: {e}")
+                self._api_data = cached['data']
+            else:
+                logger.error(f"Failed to load API metadata: {e}")
+                self._api_data = {}
+            return
+        
+        if not_modified:
+            # Unchanged upstream: keep the cached copy and start a new TTL window
+            self._api_data = cached['data']
+            logger.info(f"API metadata not modified, using cache {cache_path}")
+            try:
+                os.utime(cache_path)
+            except OSError as e:
+                logger.warning(f"Failed to renew API metadata cache {cache_path}: {e}")
+            return
+        
+        self._api_data = data
+        logger.info(f"Successfully loaded API metadata from {endpoint}")
+        if self.cache_ttl > 0:
+            self._write_disk_cache(cache_path, self._api_data, response.headers.get('Last-Modified'))
     
-    def _navigate_nested_dict(self, data: Dict[str, Any], keys: List[str]) -> Any:
+    def _cache_path(self) -> Path:
+        """Cache file for this endpoint and credential; the token only enters as a hash"""
+        token_hash = hashlib.sha256((self.auth_token or '').encode()).hexdigest()
+        digest = hashlib.sha256(f"{self.base_url}|{token_hash}".encode()).hexdigest()[:32]
+        return self.CACHE_DIR / f"{digest}.json"
+    
+    @staticmethod
+    def _read_disk_cache(path: Path) -> Tuple[Optional[Dict[str, Any]], Optional[float]]:
+        """Return (cache entry, age in seconds), or (None, None) if there is no usable entry"""
+        try:
+            age = time.time() - path.stat().st_mtime
+            with open(path, 'rb') as f:
+                entry = _loads(f.read())
+        except (OSError, ValueError):
+            return None, None
+        if not isinstance(entry, dict) or not isinstance(entry.get('data'), dict):
+            logger.warning(f"Ignoring malformed API metadata cache {path}")
+            return None, None
+        return entry, age
+    
+    @staticmethod
+    def _write_disk_cache(path: Path, data: Dict[str, Any], last_modified: Optional[str]) -> None:
+        """
+        Write the cache entry atomically so concurrent readers never see a
+        partial file. The payload may hold sensitive config, so the file is
+        created readable by the owner only.
+        """
+        try:
+            path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump({'last_modified': last_modified, 'data': data}, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write API metadata cache {path}: {e}")
+    
+    def _navigate_nested_dict(self, data: Dict[str, Any], keys: Sequence[str]) -> Any:
         """Navigate through nested dictionary using a list of keys"""
+        # EAFP: a missing key or a non-dict hop (list/str/number indexed by a str) ends the walk
         current = data
-        for key in keys:
-            if isinstance(current, dict) and key in current:
+        try:
+            for key in keys:
                 current = current[key]
-            else:
-                return None
+        except (KeyError, TypeError):
+            return None
         return current
     
-    def _query_list(self, items: List[Dict[str, Any]], conditions: Dict[str, Any]) -> List[Any]:
-        """Query a list of dictionaries based on conditions"""
+    def _query_list(self, items: List[Dict[str, Any]],
+                    conditions: Tuple[Tuple[str, Any], ...]) -> List[Any]:
+        """Query a list of dictionaries based on (field, value) conditions"""
         results = []
+        append = results.append
         for item in items:
-            if all(item.get(k) == v for k, v in conditions.items()):
-                results.append(item)
+            get = item.get
+            if all(get(k) == v for k, v in conditions):
+                append(item)
         return results
     
+    def _lookup(self, list_path: str, list_data: List[Any],
+                conditions: Tuple[Tuple[str, str], ...]) -> List[Any]:
+        """Items matching all conditions, via a hash index built on first use per field set"""
+        # Checked once per list rather than per lookup, which would make every lookup O(N)
+        indexable = self._indexable.get(list_path)
+        if indexable is None:
+            indexable = self._indexable[list_path] = all(isinstance(item, dict) for item in list_data)
+        if not indexable:
+            return self._query_list(list_data, conditions)
+        
+        fields = tuple(field for field, _ in conditions)
+        index_key = (list_path, fields)
+        index = self._indexes.get(index_key)
+        if index is None:
+            index = {}
+            for item in list_data:
+                try:
+                    index.setdefault(tuple(item.get(f) for f in fields), []).append(item)
+                except TypeError:
+                    # Unhashable values can't equal a query string, so they never match
+                    pass
+            self._indexes[index_key] = index
+        
+        return index.get(tuple(value for _, value in conditions), [])
+    
     def fetch(self, key: str) -> Optional[Any]:
         """
         Fetch metadata using various query patterns:
@@ -239,6 +453,7 @@ class ApiMetadataSource(MetadataSource):
         - Query syntax: 'servicePrinciples[bookingCenter=001].name' -> returns filtered results
         - List field extraction: 'storageContainers[bookingCenterCode=001].storageName' -> returns list of values
         """
+        self._ensure_loaded()
         if not self._api_data:
             return None
         
@@ -246,51 +461,37 @@ class ApiMetadataSource(MetadataSource):
         if '[' in key and ']' in key:
             return self._handle_query_syntax(key)
         
-        # Handle dot notation for nested access
-        if '.' in key:
-            keys = key.split('.')
-            return self._navigate_nested_dict(self._api_data, keys)
-        
-        # Simple key access
-        return self._api_data.get(key)
+        # Simple keys and dot notation are precomputed at load
+        return self._flat.get(key)
     
     def _handle_query_syntax(self, query: str) -> Optional[Any]:
         """
         Handle query syntax like 'servicePrinciples[bookingCenter=001].name'
         Returns single value, list of values, or list of objects based on query
         """
-        import re
-        
-        # Parse the query pattern
-        match = re.match(r'([^[]+)\[([^]]+)\](?:\.(.+))?', query)
-        if not match:
+        # Parse the query pattern (cached per query string)
+        parsed = _parse_query(query)
+        if parsed is None:
             return None
         
-        list_path, conditions_str, target_field = match.groups()
+        list_path, conditions, target_path = parsed
         
         # Get the list to query
         list_data = self._api_data.get(list_path)
         if not isinstance(list_data, list):
             return None
         
-        # Parse conditions
-        conditions = {}
-        for condition in conditions_str.split(','):
-            if '=' in condition:
-                field, value = condition.strip().split('=', 1)
-                conditions[field.strip()] = value.strip()
-        
         # Filter the list based on conditions
-        filtered_items = self._query_list(list_data, conditions)
+        filtered_items = self._lookup(list_path, list_data, conditions)
         
         if not filtered_items:
             return None
         
         # Extract target field if specified
-        if target_field:
+        if target_path:
             results = []
             for item in filtered_items:
-                value = self._navigate_nested_dict(item, target_field.split('.'))
+                value = self._navigate_nested_dict(item, target_path)
                 if value is not None:
                     results.append(value)
             
@@ -300,20 +501,55 @@ class ApiMetadataSource(MetadataSource):
             return results if results else None
         
         # Return the filtered objects if no target field specified
-        return filtered_items if len(filtered_items) > 1 else filtered_items[0]
+        # Copy so callers can't mutate the shared index bucket
+        return list(filtered_items) if len(filtered_items) > 1 else filtered_items[0]
     
-    def fetch_all(self) -> Dict[str, Any]:
+    def fetch_batch(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Fetch several keys in one POST to the batch endpoint.
+        Falls back to per-key fetch once the full payload is loaded, as the
+        keys can then be answered locally, or if the endpoint fails.
+        """
+        if self._batch_supported and not self._loaded:
+            try:
+                endpoint = f"{self.base_url}/metadata/batch"
+                response = self._session.post(endpoint, json={"keys": list(keys)}, timeout=self.timeout)
+                if response.status_code in (404, 405):
+                    logger.info(f"Batch endpoint not available at {endpoint}, using per-key fetch")
+                    self._batch_supported = False
+                else:
+                    response.raise_for_status()
+                    data = _loads(response.content)
+                    return {key: data.get(key) for key in keys}
+            except Exception as e:
+                # Don't retry (and log) a failing endpoint on every call
+                logger.error(f"Failed to batch-fetch API metadata, using per-key fetch: {e}")
+                self._batch_supported = False
+        
+        return {key: self.fetch(key) for key in keys}
+    
+    def fetch_all(self) -> Mapping[str, Any]:
         """Return all API metadata"""
-        return self._api_data.copy()
+        self._ensure_loaded()
+        return MappingProxyType(self._api_data)
     
     def refresh(self) -> None:
-        """Reload metadata from API"""
-        self._load_api_data()
+        """Mark metadata stale; it is reloaded from the API on next access"""
+        self._loaded = False
+    
+    def close(self) -> None:
+        """Release pooled HTTP connections"""
+        self._session.close()
 
 
 class Metadata:
     """Main metadata manager that aggregates all sources"""
     
+    __slots__ = ('_sources', '_cache', '_cache_lock', '_overlay', 'dsf_domain', 'config')
+    
+    # Most resolved (key, source) lookups kept; least recently used are evicted
+    CACHE_SIZE = 1024
+    
     def __init__(self, environment_config_path: str = "config/environments.json"):
         """
         Initialize Metadata manager
@@ -322,6 +558,12 @@ class Metadata:
             environment_config_path: Path to environment configuration JSON
         """
         self._sources: Dict[str, MetadataSource] = {}
+        # Resolved values keyed by (key, source), in LRU order; cleared on refresh()
+        self._cache: "OrderedDict[Tuple[str, Optional[str]], Any]" = OrderedDict()
+        # Tasks read metadata from worker threads, and LRU reordering mutates the dict
+        self._cache_lock = threading.Lock()
+        # Every key reachable across sources, flattened to dot paths, highest priority winning
+        self._overlay: Dict[str, Any] = {}
         
         # Step 1: Initialize environment source first (no prefix)
         self._sources['env'] = EnvironmentMetadataSource(prefix="")
@@ -339,6 +581,7 @@ class Metadata:
         
         # Step 4: Initialize other sources based on loaded config
         self._initialize_additional_sources()
+        self._rebuild_overlay()
     
     def _initialize_additional_sources(self) -> None:
         """Initialize YAML and API sources based on MetadataConfig"""
@@ -356,9 +599,23 @@ class Metadata:
             self._sources['api'] = ApiMetadataSource(
                 base_url=self.config.api_base_url,
                 auth_token=api_token,
-                timeout=self.config.api_timeout
+                timeout=self.config.api_timeout,
+                cache_ttl=self.config.cache_ttl
             )
     
+    def _rebuild_overlay(self) -> None:
+        """
+        Merge env and yaml into one flat dict, env overriding yaml. The API is
+        left out so it stays lazily loaded; it is lowest priority, so keys it
+        serves are exactly the overlay misses, which fall through to _resolve.
+        """
+        overlay: Dict[str, Any] = {}
+        if 'yaml' in self._sources:
+            overlay.update(_iter_flat(self._sources['yaml'].fetch_all()))
+        # Environment keys are used verbatim, never navigated
+        overlay.update(self._sources['env'].fetch_all())
+        self._overlay = overlay
+    
     def get(self, key: str, default: Any = None, 
             source: Optional[str] = None) -> Any:
         """
@@ -372,22 +629,53 @@ class Metadata:
         
         Returns:
             The metadata value or default
+        
+        Lookups across all sources are served from a merged env/yaml overlay
+        where possible; everything else is memoized per (key, source). Call
+        refresh() to pick up changes made to the underlying sources.
         """
-        value = None
+        if source is None:
+            value = self._overlay.get(key)
+            if value is not None:
+                return value
+        
+        # Source-specific lookups and query syntax aren't in the overlay
+        cache_key = (key, source)
+        try:
+            with self._cache_lock:
+                value = self._cache[cache_key]
+                self._cache.move_to_end(cache_key)
+        except KeyError:
+            # Resolve outside the lock so a slow API load doesn't block other lookups
+            value = self._resolve(key, source)
+            self._remember(cache_key, value)
         
+        return value if value is not None else default
+    
+    def _remember(self, cache_key: Tuple[str, Optional[str]], value: Any) -> None:
+        """Memoize a resolved value, evicting the least recently used past CACHE_SIZE"""
+        with self._cache_lock:
+            self._cache[cache_key] = value
+            self._cache.move_to_end(cache_key)
+            if len(self._cache) > self.CACHE_SIZE:
+                self._cache.popitem(last=False)
+    
+    def _resolve(self, key: str, source: Optional[str] = None) -> Any:
+        """Look up a key in a specific source or across all sources"""
         if source:
             # Fetch from specific source
             if source in self._sources:
-                value = self._sources[source].fetch(key)
-        else:
-            # Search all sources in priority order: env -> yaml -> api
-            for source_name in ['env', 'yaml', 'api']:
-                if source_name in self._sources:
-                    value = self._sources[source_name].fetch(key)
-                    if value is not None:
-                        break
+                return self._sources[source].fetch(key)
+            return None
         
-        return value if value is not None else default
+        # Search all sources in priority order: env -> yaml -> api
+        for source_name in ['env', 'yaml', 'api']:
+            if source_name in self._sources:
+                value = self._sources[source_name].fetch(key)
+                if value is not None:
+                    return value
+        
+        return None
     
     def get_required(self, key: str, source: Optional[str] = None) -> Any:
         """Get required metadata value, raise exception if not found"""
@@ -399,22 +687,65 @@ class Metadata:
     
     def get_batch(self, keys: List[str], 
                   source: Optional[str] = None) -> Dict[str, Any]:
-        """Fetch multiple keys at once"""
-        return {key: self.get(key, source=source) for key in keys}
+        """
+        Fetch multiple keys at once.
+        
+        Keys are first looked up in the env/yaml overlay and the memo;
+        everything the API has to answer then goes out in a single batch
+        request, before the full API payload is ever downloaded.
+        """
+        if source not in (None, 'api') or 'api' not in self._sources:
+            return {key: self.get(key, source=source) for key in keys}
+        
+        result: Dict[str, Any] = {}
+        unresolved = []
+        for key in keys:
+            value = self._overlay.get(key) if source is None else None
+            if value is None:
+                with self._cache_lock:
+                    if (key, source) not in self._cache:
+                        unresolved.append(key)
+                        continue
+                    value = self._cache[(key, source)]
+                    self._cache.move_to_end((key, source))
+            result[key] = value
+        
+        if unresolved:
+            fetched = self._sources['api'].fetch_batch(unresolved)
+            for key in unresolved:
+                value = result[key] = fetched.get(key)
+                self._remember((key, source), value)
+        
+        return result
+    
+    def get_many(self, keys: Iterable[Tuple[str, Optional[str]]]) -> Dict[Tuple[str, Optional[str]], Any]:
+        """Fetch (key, source) pairs at once, with one get_batch() call per source"""
+        by_source: Dict[Optional[str], List[str]] = {}
+        for key, source in keys:
+            by_source.setdefault(source, []).append(key)
+        
+        result = {}
+        for source, names in by_source.items():
+            for key, value in self.get_batch(names, source=source).items():
+                result[(key, source)] = value
+        return result
     
     def refresh(self, source: Optional[str] = None) -> None:
         """Refresh metadata from sources"""
+        with self._cache_lock:
+            self._cache.clear()
         if source:
             if source in self._sources:
                 self._sources[source].refresh()
         else:
             for src in self._sources.values():
                 src.refresh()
+        self._rebuild_overlay()
     
     def get_all(self, source: Optional[str] = None) -> Dict[str, Any]:
         """Get all metadata from a specific source or all sources"""
         if source and source in self._sources:
-            return self._sources[source].fetch_all()
+            return dict(self._sources[source].fetch_all())
         
         # Merge all sources (later sources override earlier ones)
         all_metadata = {}
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+from metadata import Metadata
+
+
+class _Response:
+    def __init__(self, payload, status_code=200):
+        self.status_code = status_code
+        self.content = json.dumps(payload).encode()
+        self.headers = {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise RuntimeError(f"HTTP {self.status_code}")
+
+
+class _Session:
+    """Stands in for the pooled requests.Session, recording every call"""
+
+    def __init__(self, batch_payload, full_payload):
+        self.batch_payload = batch_payload
+        self.full_payload = full_payload
+        self.calls = []
+
+    def get(self, url, **kwargs):
+        self.calls.append(('GET', url))
+        return _Response(self.full_payload)
+
+    def post(self, url, json=None, **kwargs):
+        self.calls.append(('POST', url, tuple(json['keys'])))
+        return _Response({key: self.batch_payload.get(key) for key in json['keys']})
+
+
+@pytest.fixture
+def metadata(tmp_path, monkeypatch):
+    config = {"dev": {"name": "dev", "api_base_url": "https://api.test"}}
+    (tmp_path / "environments.json").write_text(json.dumps(config))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DSF_DOMAIN', 'D')
+    monkeypatch.setenv('WAREHOUSE_HOST', 'warehouse.test')
+    return Metadata(environment_config_path=str(tmp_path / "environments.json"))
+
+
+def test_get_batch_sends_api_keys_in_one_post(metadata):
+    session = _Session(batch_payload={'swci': 'X1', 'resourceGroup': 'rg'},
+                       full_payload={'swci': 'X1', 'resourceGroup': 'rg'})
+    metadata._sources['api']._session = session
+
+    result = metadata.get_batch(['WAREHOUSE_HOST', 'swci', 'resourceGroup', 'absent'])
+
+    assert result == {'WAREHOUSE_HOST': 'warehouse.test', 'swci': 'X1',
+                      'resourceGroup': 'rg', 'absent': None}
+    assert session.calls == [('POST', 'https://api.test/metadata/batch', ('swci', 'resourceGroup', 'absent'))]
+
+    # Batched answers are memoized like get() results
+    assert metadata.get('swci') == 'X1'
+    assert len(session.calls) == 1